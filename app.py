@@ -1,812 +1,2155 @@
-import os
-from datetime import datetime
-from io import BytesIO
-
-import streamlit as st
-from dotenv import load_dotenv
-from openai import OpenAI
-from PIL import Image, ImageDraw, ImageFont
-import textwrap
-
-# Optional PDF support
-try:
-    from reportlab.lib.pagesizes import letter
-    from reportlab.pdfgen import canvas
-
-    HAS_REPORTLAB = True
-except ImportError:
-    HAS_REPORTLAB = False
-
-# -------------------------
-# Load environment variables
-# -------------------------
-load_dotenv()
-
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
-FREE_DAILY_LIMIT = int(os.getenv("FREE_DAILY_LIMIT", 5))
-PREMIUM_ACCESS_CODE = os.getenv("PREMIUM_ACCESS_CODE", "")
-
-if not OPENAI_API_KEY:
-    st.set_page_config(page_title="SuperBrain AI", layout="wide")
-    st.error(
-        "No OpenAI API key found.\n\n"
-        "Set **OPENAI_API_KEY** in your `.env` (local) or **Secrets** (Streamlit Cloud)."
-    )
-    st.stop()
-
-client = OpenAI(api_key=OPENAI_API_KEY)
-
-# -------------------------
-# Page configuration
-# -------------------------
-st.set_page_config(page_title="SuperBrain AI", layout="wide")
-
-# -------------------------
-# Session state init
-# -------------------------
-if "is_premium" not in st.session_state:
-    st.session_state.is_premium = False
-
-if "request_count" not in st.session_state:
-    st.session_state.request_count = 0
-
-if "chat_history" not in st.session_state:
-    # list[dict]: {"role": "user"/"assistant", "content": "..."}
-    st.session_state.chat_history = []
-
-if "first_used_at" not in st.session_state:
-    st.session_state.first_used_at = datetime.utcnow().isoformat()
-
-if "show_premium_popup" not in st.session_state:
-    st.session_state.show_premium_popup = False
-
-if "mode" not in st.session_state:
-    st.session_state.mode = "General Chat"
-
-APP_NAME = "SuperBrain AI"
-
-# -------------------------
-# Helper functions
-# -------------------------
-def can_use_ai() -> bool:
-    """Check if the user is allowed to make another request."""
-    if st.session_state.is_premium:
-        return True
-
-    if st.session_state.request_count >= FREE_DAILY_LIMIT:
-        st.warning(
-            f"⚠️ You reached the free limit of **{FREE_DAILY_LIMIT}** requests "
-            "for this session.\n\nUpgrade to **Premium** for unlimited access."
-        )
-        return False
-    return True
-
-
-def register_request() -> None:
-    """Increment request counter for non-premium users."""
-    if not st.session_state.is_premium:
-        st.session_state.request_count += 1
-
-
-def call_openai(system_prompt: str, user_prompt: str) -> str | None:
-    """Wrapper around OpenAI chat.completions."""
-    if not can_use_ai():
-        return None
-
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-        )
-        register_request()
-        return response.choices[0].message.content
-    except Exception as e:
-        return f"❌ Error calling OpenAI API: {e}"
-
-
-def add_chat_message(role: str, content: str) -> None:
-    st.session_state.chat_history.append({"role": role, "content": content})
-
-
-def build_transcript() -> str:
-    """Create a plain text transcript of the chat."""
-    if not st.session_state.chat_history:
-        return "No messages yet."
-    lines = []
-    for m in st.session_state.chat_history:
-        speaker = "You" if m["role"] == "user" else "SuperBrain AI"
-        lines.append(f"{speaker}: {m['content']}")
-        lines.append("")
-    return "\n".join(lines)
-
-
-def create_pdf_from_text(text: str) -> bytes | None:
-    """Create a PDF bytes object from text, if reportlab is available."""
-    if not HAS_REPORTLAB:
-        return None
-
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=letter)
-    width, height = letter
-    x_margin, y_margin = 40, 40
-    y = height - y_margin
-
-    for line in text.splitlines():
-        wrapped_lines = textwrap.wrap(line, 90) or [""]
-        for wline in wrapped_lines:
-            c.drawString(x_margin, y, wline)
-            y -= 14
-            if y < y_margin:
-                c.showPage()
-                y = height - y_margin
-
-    c.save()
-    pdf_bytes = buffer.getvalue()
-    buffer.close()
-    return pdf_bytes
-
-
-def create_jpg_from_text(text: str) -> bytes:
-    """Create a simple JPG image containing the chat transcript."""
-    lines = text.splitlines() or [""]
-    max_line_len = max(len(line) for line in lines)
-    char_w, char_h = 7, 14
-
-    width = min(max_line_len * char_w + 40, 2000)
-    height = min(len(lines) * (char_h + 4) + 40, 4000)
-
-    img = Image.new("RGB", (max(width, 200), max(height, 100)), "white")
-    draw = ImageDraw.Draw(img)
-    font = ImageFont.load_default()
-
-    y = 20
-    for line in lines:
-        draw.text((20, y), line, fill="black", font=font)
-        y += char_h + 4
-
-    buf = BytesIO()
-    img.save(buf, format="JPEG")
-    return buf.getvalue()
-
-
-# -------------------------
-# Global styles (chat bubbles, etc.)
-# -------------------------
-st.markdown(
-    """
-    <style>
-        @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap');
-
-        html, body, [class*="css"] {
-            font-family: 'Inter', system-ui, -apple-system, BlinkMacSystemFont, "Segoe UI", sans-serif;
-        }
-
-        /* Center top logo */
-        .logo-container {
-            display: flex;
-            justify-content: center;
-            margin-top: 0.5rem;
-            margin-bottom: 0.3rem;
-        }
-
-        /* Premium badge */
-        .premium-badge {
-            text-align: center;
-            padding: 6px 16px;
-            border-radius: 999px;
-            display: inline-block;
-            font-size: 0.85rem;
-            font-weight: 600;
-            margin-bottom: 1rem;
-        }
-        .premium-badge-free {
-            background: linear-gradient(90deg, #f97316, #facc15);
-            color: #111827;
-            box-shadow: 0 4px 12px rgba(0,0,0,0.15);
-        }
-        .premium-badge-pro {
-            background: linear-gradient(90deg, #4f46e5, #9333ea);
-            color: white;
-            box-shadow: 0 4px 14px rgba(79,70,229,0.6);
-        }
-
-        /* SuperBrain Signature Chat Bubbles (A: gradient glow) */
-        .chat-bubble-user {
-            background: linear-gradient(135deg, #38bdf8, #4f46e5);
-            color: white;
-            padding: 0.7rem 0.9rem;
-            border-radius: 16px 16px 4px 16px;
-            margin-bottom: 0.4rem;
-            max-width: 80%;
-            margin-left: auto;
-            font-size: 0.95rem;
-            box-shadow: 0 0 14px rgba(56, 189, 248, 0.4);
-        }
-        .chat-bubble-ai {
-            background: linear-gradient(135deg, #8b5cf6, #0ea5e9);
-            color: #f9fafb;
-            padding: 0.7rem 0.9rem;
-            border-radius: 16px 16px 16px 4px;
-            margin-bottom: 0.4rem;
-            max-width: 80%;
-            margin-right: auto;
-            font-size: 0.95rem;
-            box-shadow: 0 0 14px rgba(139, 92, 246, 0.45);
-        }
-        .chat-label {
-            font-size: 0.75rem;
-            color: #6b7280;
-            margin-bottom: 0.1rem;
-        }
-        .chat-label-user {
-            text-align: right;
-        }
-        .chat-label-ai {
-            text-align: left;
-        }
-
-        /* Typing indicator dots */
-        .typing-bubble {
-            background: linear-gradient(135deg, #8b5cf6, #0ea5e9);
-            color: #f9fafb;
-            padding: 0.7rem 0.9rem;
-            border-radius: 16px 16px 16px 4px;
-            margin-bottom: 0.4rem;
-            max-width: 120px;
-            margin-right: auto;
-            font-size: 0.95rem;
-            box-shadow: 0 0 14px rgba(139, 92, 246, 0.45);
-        }
-        .typing-dots span {
-            display: inline-block;
-            font-size: 1.2rem;
-            animation: blink 1.4s infinite both;
-        }
-        .typing-dots span:nth-child(2) {
-            animation-delay: 0.2s;
-        }
-        .typing-dots span:nth-child(3) {
-            animation-delay: 0.4s;
-        }
-        @keyframes blink {
-            0% { opacity: .2; }
-            20% { opacity: 1; }
-            100% { opacity: .2; }
-        }
-
-        /* Scrollable chat container */
-        #chat-container {
-            max-height: 420px;
-            overflow-y: auto;
-            padding-right: 10px;
-            padding-left: 2px;
-            padding-top: 4px;
-            padding-bottom: 4px;
-        }
-
-        /* Premium popup card */
-        .premium-popup {
-            border-radius: 18px;
-            padding: 1.2rem 1.4rem;
-            background: linear-gradient(135deg, #0f172a, #020617);
-            color: #e5e7eb;
-            box-shadow: 0 18px 40px rgba(15,23,42,0.7);
-            border: 1px solid #4f46e5;
-        }
-
-        /* Analytics cards */
-        .metric-card {
-            padding: 0.9rem 1rem;
-            border-radius: 14px;
-            background: #f9fafb;
-            border: 1px solid #e5e7eb;
-        }
-
-        /* Floating-ish input look (pill style) */
-        textarea {
-            border-radius: 999px !important;
-        }
-    </style>
-    """,
-    unsafe_allow_html=True,
-)
-
-# -------------------------
-# Sidebar (theme + modes + premium)
-# -------------------------
-st.sidebar.title(APP_NAME)
-
-theme_choice = st.sidebar.selectbox("Theme", ["Light", "Dark"], index=0)
-if theme_choice == "Dark":
-    st.markdown(
-        """
-        <style>
-        .stApp { background-color: #020617; color: #e5e7eb; }
-        .metric-card { background: #020617; border-color: #1f2937; }
-        #chat-container { border-color: #111827; }
-        </style>
-        """,
-        unsafe_allow_html=True,
-    )
-
-mode = st.sidebar.selectbox(
-    "Choose AI Tool",
-    [
-        "General Chat",
-        "Resume & Cover Letter",
-        "Blog / Social Post Writer",
-        "Email Writer",
-        "Code Helper",
-        "Usage Analytics",
-    ],
-)
-st.session_state.mode = mode
-
-st.sidebar.subheader("Usage")
-remaining = (
-    "Unlimited" if st.session_state.is_premium else max(FREE_DAILY_LIMIT - st.session_state.request_count, 0)
-)
-st.sidebar.write(f"Requests used: **{st.session_state.request_count}**")
-st.sidebar.write(f"Requests remaining: **{remaining}**")
-
-if not st.session_state.is_premium:
-    st.sidebar.progress(
-        min(st.session_state.request_count / max(FREE_DAILY_LIMIT, 1), 1.0)
-    )
-
-st.sidebar.markdown("---")
-
-# Premium unlock by code
-st.sidebar.subheader("🔑 Have a Premium Code?")
-code_input = st.sidebar.text_input("Enter access code", type="password")
-if st.sidebar.button("Unlock Premium"):
-    if PREMIUM_ACCESS_CODE and code_input == PREMIUM_ACCESS_CODE:
-        st.session_state.is_premium = True
-        st.session_state.request_count = 0
-        st.success("🎉 Premium unlocked – enjoy unlimited usage!")
-    else:
-        st.error("❌ Invalid or missing premium code.")
-
-# Show upgrade info only if not premium
-if not st.session_state.is_premium:
-    st.sidebar.markdown("---")
-    st.sidebar.subheader("💳 Upgrade to Premium")
-    st.sidebar.markdown(
-        "[Pay ₹299 on Razorpay](https://rzp.io/rzp/HuxrI9w)"
-    )
-    st.sidebar.caption(
-        "After payment, your **SuperBrain AI Premium Code** will be sent to you.\n"
-        "Enter it above to unlock unlimited access."
-    )
-
-# Button to open premium popup
-if not st.session_state.is_premium:
-    if st.sidebar.button("View Premium Benefits"):
-        st.session_state.show_premium_popup = True
-else:
-    st.sidebar.success("You are a Premium user. 🚀")
-
-# -------------------------
-# Top: Logo + Title + Badge
-# -------------------------
-# Resolve logo path safely
-logo_path = "superbrain_logo.png"
-if not os.path.exists(logo_path):
-    if os.path.exists("SuperBrain.png"):
-        logo_path = "SuperBrain.png"
-    else:
-        logo_path = None
-
-if logo_path:
-    st.markdown('<div class="logo-container">', unsafe_allow_html=True)
-    st.image(logo_path, width=150)
-    st.markdown("</div>", unsafe_allow_html=True)
-
-# Badge (no "Free" watermark for premium)
-st.markdown(
-    '<div style="text-align:center;">',
-    unsafe_allow_html=True,
-)
-if st.session_state.is_premium:
-    st.markdown(
-        '<span class="premium-badge premium-badge-pro">✨ Premium User — Unlimited Access</span>',
-        unsafe_allow_html=True,
-    )
-else:
-    st.markdown(
-        '<span class="premium-badge premium-badge-free">⚡ Free User — Limited Access</span>',
-        unsafe_allow_html=True,
-    )
-st.markdown("</div>", unsafe_allow_html=True)
-
-st.title(APP_NAME)
-st.caption("Your multi-skill AI assistant powered by OpenAI + Streamlit.")
-
-# -------------------------
-# Premium Popup (simple modal-like card)
-# -------------------------
-if st.session_state.show_premium_popup and not st.session_state.is_premium:
-    with st.container():
-        st.markdown('<div class="premium-popup">', unsafe_allow_html=True)
-        cols = st.columns([3, 1])
-        with cols[0]:
-            st.subheader("🚀 SuperBrain AI Premium")
-            st.write(
-                "- Unlimited AI requests per session\n"
-                "- Faster responses for heavy prompts\n"
-                "- Priority for new tools & features\n"
-                "- No free-tier usage limits or banners"
-            )
-            st.write("After you pay on Razorpay, you'll receive a **Premium Access Code** by email.")
-        with cols[1]:
-            st.markdown("**Price**")
-            st.markdown("### ₹299 / month")
-            st.markdown(
-                "[Upgrade via Razorpay](https://rzp.io/rzp/HuxrI9w)",
-                unsafe_allow_html=True,
-            )
-        st.markdown("</div>", unsafe_allow_html=True)
-        if st.button("Close Premium Details"):
-            st.session_state.show_premium_popup = False
-
-st.write("---")
-
-# -------------------------
-# MAIN MODES
-# -------------------------
-
-# 1) GENERAL CHAT — ChatGPT-style (history on top, input at bottom)
-if mode == "General Chat":
-    st.subheader("💬 Chat with SuperBrain")
-
-    # Optional: file attachment for context
-    uploaded_file = st.file_uploader(
-        "Attach a text/code file for SuperBrain to read (optional)",
-        type=["txt", "md", "py", "csv", "json"],
-        key="chat_file_uploader",
-    )
-    attached_text = ""
-    attached_name = ""
-    if uploaded_file is not None:
-        try:
-            attached_text = uploaded_file.read().decode("utf-8", errors="ignore")
-            attached_name = uploaded_file.name
-        except Exception:
-            attached_text = ""
-            attached_name = ""
-
-    # Scrollable chat history container
-    st.markdown(
-        "<div id='chat-container'>",
-        unsafe_allow_html=True,
-    )
-
-    if not st.session_state.chat_history:
-        st.info("Start the conversation by typing a message below.")
-    else:
-        for m in st.session_state.chat_history:
-            role = m["role"]
-            content = m["content"]
-            if role == "user":
-                st.markdown(
-                    '<div class="chat-label chat-label-user">You</div>',
-                    unsafe_allow_html=True,
-                )
-                st.markdown(
-                    f'<div class="chat-bubble-user">{content}</div>',
-                    unsafe_allow_html=True,
-                )
-            else:
-                st.markdown(
-                    '<div class="chat-label chat-label-ai">SuperBrain AI</div>',
-                    unsafe_allow_html=True,
-                )
-                st.markdown(
-                    f'<div class="chat-bubble-ai">{content}</div>',
-                    unsafe_allow_html=True,
-                )
-
-    st.markdown("</div>", unsafe_allow_html=True)
-
-    # Placeholder for typing indicator (above next AI message)
-    typing_placeholder = st.empty()
-
-    # Auto-scroll to bottom of chat container
-    st.markdown(
-        """
-        <script>
-        const chatContainer = document.getElementById('chat-container');
-        if (chatContainer) {
-            chatContainer.scrollTop = chatContainer.scrollHeight;
-        }
-        </script>
-        """,
-        unsafe_allow_html=True,
-    )
-
-    st.write("")  # small spacer
-
-    # Input at the bottom (ChatGPT-style)
-    with st.container():
-        user_message = st.text_area("Type your message:", key="general_chat_box", height=80)
-        col_input = st.columns([1, 1, 1, 1])
-        send_clicked = col_input[0].button("Send")
-        clear_clicked = col_input[1].button("Clear Chat")
-        # download buttons in same footer row
-        has_history = bool(st.session_state.chat_history)
-
-        if has_history:
-            transcript = build_transcript()
-
-            txt_data = transcript.encode("utf-8")
-            col_input[2].download_button(
-                "⬇️ TXT",
-                data=txt_data,
-                file_name="superbrain_chat.txt",
-                mime="text/plain",
-            )
-
-            # For PDF, only if reportlab installed
-            if HAS_REPORTLAB:
-                pdf_bytes = create_pdf_from_text(transcript)
-                if pdf_bytes:
-                    col_input[3].download_button(
-                        "⬇️ PDF",
-                        data=pdf_bytes,
-                        file_name="superbrain_chat.pdf",
-                        mime="application/pdf",
-                    )
-            else:
-                col_input[3].markdown(
-                    "<small>PDF export needs `reportlab` installed.</small>",
-                    unsafe_allow_html=True,
-                )
-
-        # Clear chat action
-        if clear_clicked:
-            st.session_state.chat_history = []
-            st.experimental_rerun()
-
-    # Extra row for JPG export if history exists
-    if st.session_state.chat_history:
-        transcript = build_transcript()
-        jpg_bytes = create_jpg_from_text(transcript)
-        st.download_button(
-            "⬇️ JPG (chat snapshot)",
-            data=jpg_bytes,
-            file_name="superbrain_chat.jpg",
-            mime="image/jpeg",
-        )
-
-    # Handle sending message + typing indicator
-    if send_clicked and user_message.strip():
-        # Merge attachment into user message if any
-        full_user_message = user_message
-        if attached_text:
-            full_user_message += f"\n\n[Attached file: {attached_name}]\n{attached_text[:4000]}"
-
-        add_chat_message("user", full_user_message)
-
-        # Show typing indicator bubble above the upcoming AI message
-        with typing_placeholder:
-            st.markdown(
-                """
-                <div class="chat-label chat-label-ai">SuperBrain AI</div>
-                <div class="typing-bubble">
-                    <span class="typing-dots">
-                        <span>.</span><span>.</span><span>.</span>
-                    </span>
-                </div>
-                """,
-                unsafe_allow_html=True,
-            )
-
-        # Build messages with history (including new user message)
-        messages = [
-            {
-                "role": "system",
-                "content": "You are a helpful, friendly AI assistant named SuperBrain.",
-            }
-        ]
-        for m in st.session_state.chat_history:
-            messages.append({"role": m["role"], "content": m["content"]})
-
-        if can_use_ai():
-            try:
-                res = client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=messages,
-                )
-                reply = res.choices[0].message.content
-                register_request()
-                add_chat_message("assistant", reply)
-            except Exception as e:
-                st.error(f"Error talking to model: {e}")
-            finally:
-                typing_placeholder.empty()
-
-# 2) RESUME & COVER LETTER
-elif mode == "Resume & Cover Letter":
-    st.subheader("📄 Resume & Cover Letter Assistant")
-
-    name = st.text_input("Your Name")
-    role = st.text_input("Target Role (e.g., Python Developer)")
-    skills = st.text_area("Skills (comma separated)")
-    projects = st.text_area("Projects (briefly describe)")
-    experience = st.text_area("Internships / Experience")
-    extras = st.text_area("Extra info (certificates, hackathons, achievements)")
-    tone = st.selectbox(
-        "Tone",
-        ["Professional", "Friendly professional", "Very formal"],
-    )
-
-    if st.button("Generate Resume Summary & Cover Letter"):
-        if not role.strip():
-            st.warning("Please provide at least a target job role.")
-        else:
-            user_prompt = f"""
-Name: {name}
-Target Role: {role}
-Skills: {skills}
-Projects: {projects}
-Experience: {experience}
-Extra Info: {extras}
-Preferred tone: {tone}
-
-Tasks:
-1. Write a 3–4 line professional summary for my resume.
-2. Create 5–7 bullet points combining skills, projects, and experience.
-3. Write a 200–250 word cover letter tailored to the target role.
-
-Do not invent fake experience. Be honest but positive.
-"""
-            output = call_openai(
-                "You are an expert HR and resume writer helping job seekers.", user_prompt
-            )
-            if output:
-                st.subheader("Generated Content")
-                st.write(output)
-
-# 3) BLOG / SOCIAL POST WRITER
-elif mode == "Blog / Social Post Writer":
-    st.subheader("✍️ Blog & Social Media Content Writer")
-
-    content_type = st.selectbox(
-        "Content Type",
-        ["Blog Post", "LinkedIn Post", "Instagram Caption", "Twitter / X Thread"],
-    )
-    topic = st.text_input("Topic / Title")
-    audience = st.text_input("Target Audience (e.g., freshers, small business owners)")
-    length = st.selectbox("Length", ["Short", "Medium", "Long"])
-    extras = st.text_area("Extra instructions (tone, call to action, etc.)")
-
-    if st.button("Generate Content"):
-        if not topic.strip():
-            st.warning("Please provide a topic or title.")
-        else:
-            prompt = f"""
-Content type: {content_type}
-Topic: {topic}
-Target audience: {audience}
-Length: {length}
-Extra instructions: {extras}
-
-Write high-quality, original content that is helpful and engaging.
-Avoid generic fluff; provide structure, value, and a clear message.
-"""
-            output = call_openai(
-                "You are an expert content writer and social media marketer.", prompt
-            )
-            if output:
-                st.subheader("Generated Content")
-                st.write(output)
-
-# 4) EMAIL WRITER
-elif mode == "Email Writer":
-    st.subheader("📧 Professional Email Writer")
-
-    email_purpose = st.selectbox(
-        "Email Purpose",
-        [
-            "Job Application",
-            "Follow-up after Interview",
-            "Cold Email to Client",
-            "Networking / Connection Request",
-            "General Professional Email",
-        ],
-    )
-    to_whom = st.text_input("Recipient (e.g., HR, Manager, Client)")
-    context = st.text_area("Context or Details (what is this email about?)")
-    style = st.selectbox("Tone", ["Formal", "Semi-formal", "Friendly professional"])
-
-    if st.button("Generate Email"):
-        if not context.strip():
-            st.warning("Please provide some context so the email is accurate.")
-        else:
-            prompt = f"""
-Purpose: {email_purpose}
-Recipient: {to_whom}
-Context: {context}
-Tone: {style}
-
-Write a clear, polite, professional email.
-Include both a subject line and the email body.
-"""
-            output = call_openai(
-                "You are an expert at writing professional, polite emails.", prompt
-            )
-            if output:
-                st.subheader("Email Draft")
-                st.write(output)
-
-# 5) CODE HELPER
-elif mode == "Code Helper":
-    st.subheader("💻 Code Helper")
-
-    language = st.selectbox(
-        "Language",
-        ["Python", "JavaScript", "C++", "Java", "Other"],
-    )
-    help_type = st.selectbox(
-        "What do you need?",
-        ["Explain code", "Fix bug", "Write new function", "Optimize / Refactor"],
-    )
-    code_or_desc = st.text_area(
-        "Paste your code or describe the problem", height=200
-    )
-
-    if st.button("Get Coding Help"):
-        if not code_or_desc.strip():
-            st.warning("Please paste some code or description.")
-        else:
-            prompt = f"""
-Language: {language}
-Help type: {help_type}
-Code or description:
-{code_or_desc}
-
-Explain step by step, then give the improved or fixed code if relevant.
-Add comments in the code to help a beginner understand.
-"""
-            output = call_openai(
-                "You are a patient senior developer and teacher.",
-                prompt,
-            )
-            if output:
-                st.subheader("Help & Solution")
-                st.write(output)
-
-# 6) USAGE ANALYTICS
-elif mode == "Usage Analytics":
-    st.subheader("📊 Session Analytics")
-
-    total_requests = st.session_state.request_count
-    first_used = st.session_state.first_used_at
-
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-        st.metric("Total Requests This Session", total_requests)
-        st.markdown("</div>", unsafe_allow_html=True)
-    with col2:
-        st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-        st.metric(
-            "Plan",
-            "Premium" if st.session_state.is_premium else "Free",
-        )
-        st.markdown("</div>", unsafe_allow_html=True)
-    with col3:
-        st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-        st.write("First used at (UTC):")
-        st.write(first_used.split(".")[0].replace("T", " "))
-        st.markdown("</div>", unsafe_allow_html=True)
-
-    st.write("---")
-    st.write(
-        "This analytics page currently shows **session-level** statistics. "
-        "You can extend it later to log data to a database (e.g., Supabase, Postgres) "
-        "for long-term tracking."
-    )
+import asyncio
+import concurrent.futures
+import hashlib
+import hmac
+import html
+import json
+import os
+import re
+import sqlite3
+import string
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from io import BytesIO
+from types import SimpleNamespace
+from typing import TYPE_CHECKING
+
+import numpy as np
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from PIL import Image, ImageDraw, ImageFont
+import textwrap
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
+
+# Optional PDF support
+try:
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    HAS_REPORTLAB = True
+except ImportError:
+    HAS_REPORTLAB = False
+
+APP_NAME = "SuperBrain AI"
+UPGRADE_URL = "https://rzp.io/rzp/HuxrI9w"
+
+# -------------------------
+# Page configuration
+# -------------------------
+st.set_page_config(page_title=APP_NAME, layout="wide")
+
+# -------------------------
+# Load environment variables
+# -------------------------
+def _code_digest(code: str) -> bytes:
+    """Digest of an access code; surrounding whitespace (e.g. from pasting) is ignored."""
+    return hashlib.blake2b(code.strip().encode("utf-8"), digest_size=32).digest()
+
+
+@st.cache_resource(show_spinner=False)
+def settings() -> SimpleNamespace:
+    """App configuration. `.env` is parsed and the environment read once per process.
+    python-dotenv is only imported when there is a `.env` file to read (local runs;
+    Streamlit Cloud provides Secrets as environment variables)."""
+    if os.path.exists(".env"):
+        from dotenv import load_dotenv
+
+        load_dotenv()
+    free_daily_limit = int(os.getenv("FREE_DAILY_LIMIT", 5))
+    premium_code = os.getenv("PREMIUM_ACCESS_CODE", "")
+    return SimpleNamespace(
+        openai_api_key=os.getenv("OPENAI_API_KEY", ""),
+        free_daily_limit=free_daily_limit,
+        # Per-IP ceiling on free requests (0 disables it), shared by every browser
+        # behind the address. Only meaningful when the app sees real client IPs.
+        ip_daily_limit=int(os.getenv("IP_DAILY_LIMIT", 10 * free_daily_limit)),
+        # Take the client IP from X-Forwarded-For. Only enable behind a proxy that
+        # appends the real peer address; a client can write the header itself.
+        trust_forwarded_for=os.getenv("TRUST_FORWARDED_FOR", "").lower() in ("1", "true", "yes"),
+        # Hashed as it is read; the plain code is never stored. None when unset.
+        premium_code_digest=_code_digest(premium_code) if premium_code.strip() else None,
+        openai_rpm=int(os.getenv("OPENAI_RPM", 500)),
+        generation_cache_path=os.getenv("GENERATION_CACHE_PATH", ".superbrain_cache.sqlite3"),
+        chat_store_path=os.getenv("CHAT_STORE_PATH", ".superbrain_chat.sqlite3"),
+        quota_store_path=os.getenv("QUOTA_STORE_PATH", ".superbrain_quota.sqlite3"),
+    )
+
+
+_settings = settings()
+OPENAI_API_KEY = _settings.openai_api_key
+FREE_DAILY_LIMIT = _settings.free_daily_limit
+IP_DAILY_LIMIT = _settings.ip_daily_limit
+TRUST_FORWARDED_FOR = _settings.trust_forwarded_for
+
+
+# Unlock attempts are compared against this digest, so the comparison always covers
+# 32 bytes regardless of what was typed; None when no code is configured.
+PREMIUM_CODE_DIGEST = _settings.premium_code_digest
+PREMIUM_TOKEN_TTL = 30 * 24 * 3600  # seconds an unlock survives page reloads
+
+
+OPENAI_RPM = _settings.openai_rpm
+GENERATION_CACHE_PATH = _settings.generation_cache_path
+CHAT_STORE_PATH = _settings.chat_store_path
+QUOTA_STORE_PATH = _settings.quota_store_path
+
+# Model and generation parameters. Generation time grows with output length, so
+# every mode gets an explicit output cap sized for what it produces. Modes where
+# creativity isn't wanted run at low temperature with a fixed seed: the same form
+# input gives (nearly) the same answer, so the response caches hit far more often.
+MODEL = "gpt-4o-mini"
+EMBEDDING_MODEL = "text-embedding-3-small"
+MODE_PARAMS = {
+    "chat": {"max_tokens": 800, "temperature": 0.7},
+    "resume": {
+        "max_tokens": 1200,
+        "temperature": 0.2,
+        "seed": 1,
+        "response_format": {"type": "json_object"},
+    },
+    "blog_short": {"max_tokens": 400, "temperature": 0.7},
+    "blog_medium": {"max_tokens": 900, "temperature": 0.7},
+    "blog_long": {"max_tokens": 1600, "temperature": 0.7},
+    "email": {"max_tokens": 450, "temperature": 0, "seed": 1},
+    "code": {"max_tokens": 1500, "temperature": 0, "seed": 1},
+    "chat_summary": {"max_tokens": 300, "temperature": 0, "seed": 1},
+}
+
+
+def generation_params(mode: str) -> dict:
+    """Sampling arguments for `chat.completions.create` in the given mode."""
+    return dict(MODE_PARAMS[mode])
+
+
+# Fail a stalled request after 30s (the SDK default is 10 minutes). The SDK retries
+# rate limits, timeouts, connection errors and 5xx itself, with exponential backoff,
+# jitter and Retry-After, reusing one idempotency key across attempts.
+REQUEST_TIMEOUT = 30.0
+MAX_RETRIES = 3
+
+if not OPENAI_API_KEY:
+    st.error(
+        "No OpenAI API key found.\n\n"
+        "Set **OPENAI_API_KEY** in your `.env` (local) or **Secrets** (Streamlit Cloud)."
+    )
+    st.stop()
+
+
+# The SDK (and httpx/pydantic behind it) is imported on first use, so runs that
+# never call the model -- sidebar tweaks, Usage Analytics -- don't pay for it.
+@st.cache_resource(show_spinner=False)
+def get_openai_client() -> "OpenAI":
+    """Shared OpenAI client, reused across reruns and sessions (keeps the HTTP pool warm)."""
+    from openai import OpenAI
+
+    return OpenAI(api_key=OPENAI_API_KEY, timeout=REQUEST_TIMEOUT, max_retries=MAX_RETRIES)
+
+
+# No spinner: first use can be from the background event loop, where there is no
+# script context to show one in.
+@st.cache_resource(show_spinner=False)
+def get_async_openai_client() -> "AsyncOpenAI":
+    """Shared async client used for fanning out independent sub-prompts. Uses the
+    aiohttp transport when the SDK's `aiohttp` extra is installed (it handles many
+    concurrent requests better than httpx's default pool), otherwise httpx."""
+    from openai import AsyncOpenAI
+
+    try:
+        from openai import DefaultAioHttpClient
+
+        http_client = DefaultAioHttpClient()
+    except (ImportError, RuntimeError):
+        # Older SDK without the class, or the `openai[aiohttp]` extra isn't installed.
+        http_client = None
+
+    return AsyncOpenAI(
+        api_key=OPENAI_API_KEY,
+        timeout=REQUEST_TIMEOUT,
+        max_retries=MAX_RETRIES,
+        http_client=http_client,
+    )
+
+
+@st.cache_resource
+def _event_loop() -> asyncio.AbstractEventLoop:
+    """Long-lived event loop on a background thread. The async client's connection
+    pool is bound to the loop it first runs on, so `asyncio.run` (which closes its
+    loop) can't be used across reruns."""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="superbrain-asyncio", daemon=True).start()
+    return loop
+
+
+def submit_async(coro) -> concurrent.futures.Future:
+    """Schedule a coroutine on the shared event loop without waiting for it."""
+    return asyncio.run_coroutine_threadsafe(coro, _event_loop())
+
+
+class RateLimiter:
+    """Token bucket shared by every session: `rpm` request slots refill evenly over a
+    minute, so calls are paced before they hit OpenAI's per-key limit instead of
+    failing with 429s and retrying."""
+
+    def __init__(self, rpm: int):
+        self.capacity = float(max(rpm, 1))
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a slot if one is free; otherwise return how long to wait for one."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self) -> None:
+        while wait := self._reserve():
+            time.sleep(wait)
+
+    async def acquire_async(self) -> None:
+        while wait := self._reserve():
+            await asyncio.sleep(wait)
+
+
+@st.cache_resource
+def get_rate_limiter() -> RateLimiter:
+    return RateLimiter(OPENAI_RPM)
+
+
+class GenerationStore:
+    """SQLite-backed completion cache that survives restarts and is shared by every
+    session. Entries expire after `ttl` seconds and the table is trimmed to the
+    newest `max_entries` rows on write."""
+
+    def __init__(self, path: str, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._conn = sqlite3.connect(
+            path, timeout=5.0, check_same_thread=False, isolation_level=None
+        )
+        # WAL lets several app processes sharing the file read while one writes.
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS generations "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        raw = json.dumps(parts, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+    def get(self, key: str) -> list[str] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM generations WHERE key = ? AND created > ?",
+                (key, time.time() - self.ttl),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: list[str]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO generations (key, value, created) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now),
+            )
+            self._conn.execute(
+                "DELETE FROM generations WHERE created <= ? OR key NOT IN "
+                "(SELECT key FROM generations ORDER BY created DESC LIMIT ?)",
+                (now - self.ttl, self.max_entries),
+            )
+
+
+@st.cache_resource
+def get_generation_store() -> GenerationStore:
+    return GenerationStore(GENERATION_CACHE_PATH, ttl=7 * 24 * 3600, max_entries=5000)
+
+
+@st.cache_resource
+def get_recent_generations() -> GenerationStore:
+    """In-process cache for replies that must not go to the shared on-disk cache
+    (chat, emails): a repeat of the same request within the hour is answered without an API call."""
+    return GenerationStore(":memory:", ttl=3600, max_entries=256)
+
+
+class SemanticCache:
+    """Near-duplicate answer cache. Keeps the embeddings of the last `max_entries`
+    prompts with their outputs and returns the outputs of the most similar earlier
+    prompt in the same namespace when the cosine similarity reaches `threshold`.
+    Embeddings are stored uint8-quantized (per-vector offset and scale), a quarter
+    of the memory of float32, and dequantized in one einsum per lookup."""
+
+    def __init__(self, max_entries: int, threshold: float):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._entries: list[tuple] = []  # (namespace, codes, offset, scale, outputs)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _quantize(vector: np.ndarray) -> tuple[np.ndarray, float, float]:
+        lo, hi = float(vector.min()), float(vector.max())
+        scale = (hi - lo) / 255 or 1.0
+        return np.round((vector - lo) / scale).astype(np.uint8), lo, scale
+
+    def get(self, namespace, vector: np.ndarray) -> list[str] | None:
+        with self._lock:
+            entries = [e for e in self._entries if e[0] == namespace]
+        if not entries:
+            return None
+        codes = np.stack([e[1] for e in entries]).astype(np.float32)
+        offsets = np.array([e[2] for e in entries], dtype=np.float32)
+        scales = np.array([e[3] for e in entries], dtype=np.float32)
+        stored = codes * scales[:, None] + offsets[:, None]
+        dots = np.einsum("ij,j->i", stored, vector)
+        sims = dots / (np.linalg.norm(stored, axis=1) * np.linalg.norm(vector) + 1e-12)
+        best = int(np.argmax(sims))
+        return entries[best][4] if sims[best] >= self.threshold else None
+
+    def set(self, namespace, vector: np.ndarray, outputs: list[str]) -> None:
+        codes, lo, scale = self._quantize(vector)
+        with self._lock:
+            self._entries.append((namespace, codes, lo, scale, outputs))
+            del self._entries[: -self.max_entries]
+
+
+@st.cache_resource
+def get_semantic_cache() -> SemanticCache:
+    return SemanticCache(max_entries=512, threshold=0.95)
+
+
+class ChatStore:
+    """Append-only SQLite archive of chat messages, keyed by a per-conversation id.
+    Sessions keep only the tail of a conversation in memory and read older messages
+    back from here on demand. Conversations untouched for `ttl` seconds are dropped
+    when the store is opened and, at most every `purge_interval` seconds, on write:
+    a conversation whose session ended is never deleted explicitly."""
+
+    def __init__(self, path: str, ttl: float, purge_interval: float = 3600):
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self._conn = sqlite3.connect(
+            path, timeout=5.0, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chat_messages "
+            "(chat_id TEXT NOT NULL, idx INTEGER NOT NULL, role TEXT NOT NULL, "
+            "content TEXT NOT NULL, created REAL NOT NULL, PRIMARY KEY (chat_id, idx))"
+        )
+        self._lock = threading.Lock()
+        self._purge(time.time())
+
+    def _purge(self, now: float) -> None:
+        self._conn.execute(
+            "DELETE FROM chat_messages WHERE chat_id IN (SELECT chat_id FROM chat_messages "
+            "GROUP BY chat_id HAVING MAX(created) <= ?)",
+            (now - self.ttl,),
+        )
+        self._next_purge = now + self.purge_interval
+
+    def append(self, chat_id: str, idx: int, role: str, content: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chat_messages (chat_id, idx, role, content, created) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (chat_id, idx, role, content, now),
+            )
+            if now >= self._next_purge:
+                self._purge(now)
+
+    def load(self, chat_id: str, start: int = 0, stop: int | None = None) -> list[dict]:
+        """Messages with `start <= idx < stop`, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT role, content FROM chat_messages "
+                "WHERE chat_id = ? AND idx >= ? AND idx < ? ORDER BY idx",
+                (chat_id, start, stop if stop is not None else 2**63 - 1),
+            ).fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def delete(self, chat_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM chat_messages WHERE chat_id = ?", (chat_id,))
+
+
+@st.cache_resource
+def get_chat_store() -> ChatStore:
+    return ChatStore(CHAT_STORE_PATH, ttl=7 * 24 * 3600)
+
+
+def _parse_batch_output(text: str) -> dict[str, list[str]]:
+    """Map each `custom_id` in a Batch API output file to its completion choices."""
+    results = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        response = record.get("response") or {}
+        if response.get("status_code") == 200:
+            choices = response["body"]["choices"]
+            results[record["custom_id"]] = [c["message"]["content"] for c in choices]
+        else:
+            error = record.get("error") or response.get("body")
+            results[record["custom_id"]] = [f"❌ Batch request failed: {error}"]
+    return results
+
+
+class BatchJobs:
+    """Submitted Batch API jobs, shared by all sessions and kept in SQLite with the
+    inbox metadata of the browser that queued them, so neither a reload nor a
+    restart loses a batch OpenAI will still complete and bill. A daemon thread polls
+    unfinished jobs every `interval` seconds and stores the output once a job
+    completes, so reruns only read local state. Jobs older than `ttl` are dropped."""
+
+    FAILED_STATES = ("failed", "expired", "cancelled")
+
+    def __init__(self, path: str, client_factory, ttl: float, interval: float = 30.0):
+        self._client_factory = client_factory
+        self._interval = interval
+        self._conn = sqlite3.connect(
+            path, timeout=5.0, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS batch_jobs "
+            "(batch_id TEXT PRIMARY KEY, client_key TEXT NOT NULL, entry TEXT NOT NULL, "
+            "status TEXT NOT NULL, results TEXT, error TEXT, created REAL NOT NULL)"
+        )
+        self._conn.execute("DELETE FROM batch_jobs WHERE created <= ?", (time.time() - ttl,))
+        self._lock = threading.Lock()
+        threading.Thread(target=self._poll_forever, name="superbrain-batches", daemon=True).start()
+
+    def track(self, batch_id: str, client_key: str, entry: dict) -> None:
+        """Start tracking a job; `entry` is its inbox metadata (title, labels, ...)."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO batch_jobs (batch_id, client_key, entry, status, created) "
+                "VALUES (?, ?, ?, 'validating', ?)",
+                (batch_id, client_key, json.dumps(entry, ensure_ascii=False), time.time()),
+            )
+
+    def entries(self, client_key: str) -> list[dict]:
+        """Inbox metadata of this browser's jobs, oldest first, each with its "id"."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT batch_id, entry FROM batch_jobs WHERE client_key = ? ORDER BY created",
+                (client_key,),
+            ).fetchall()
+        return [{"id": batch_id, **json.loads(entry)} for batch_id, entry in rows]
+
+    def get(self, batch_id: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, results, error FROM batch_jobs WHERE batch_id = ?", (batch_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        status, results, error = row
+        return {"status": status, "results": json.loads(results) if results else None, "error": error}
+
+    def _poll_forever(self) -> None:
+        while True:
+            time.sleep(self._interval)
+            with self._lock:
+                pending = [
+                    batch_id
+                    for (batch_id,) in self._conn.execute(
+                        "SELECT batch_id FROM batch_jobs WHERE results IS NULL AND error IS NULL"
+                    )
+                ]
+            for batch_id in pending:
+                try:
+                    self._refresh(batch_id)
+                except Exception:
+                    # Network hiccup or API error: try again on the next round.
+                    continue
+
+    def _refresh(self, batch_id: str) -> None:
+        client = self._client_factory()
+        batch = client.batches.retrieve(batch_id)
+        results = error = None
+        if batch.status == "completed":
+            if batch.output_file_id:
+                content = client.files.content(batch.output_file_id)
+                results = json.dumps(_parse_batch_output(content.text), ensure_ascii=False)
+            else:
+                error = "Every request in the batch failed."
+        elif batch.status in self.FAILED_STATES:
+            error = f"Batch {batch.status}."
+        with self._lock:
+            self._conn.execute(
+                "UPDATE batch_jobs SET status = ?, results = ?, error = ? WHERE batch_id = ?",
+                (batch.status, results, error, batch_id),
+            )
+
+
+@st.cache_resource
+def get_batch_jobs() -> BatchJobs:
+    # The client is only created once there is a job to poll, so the SDK stays
+    # unimported until then.
+    return BatchJobs(CHAT_STORE_PATH, get_openai_client, ttl=7 * 24 * 3600)
+
+
+rate_limiter = get_rate_limiter()
+generation_store = get_generation_store()
+recent_generations = get_recent_generations()
+semantic_cache = get_semantic_cache()
+chat_store = get_chat_store()
+
+# -------------------------
+# Free-tier quota (server-side)
+# -------------------------
+class FreeQuota:
+    """Free-tier allowance per client as a token bucket: up to `capacity` requests,
+    refilling continuously at `capacity` per day. Bursts are allowed and an idle
+    client regains requests gradually instead of waiting for a daily reset. Buckets
+    live in SQLite, so they are shared by all sessions and app processes and neither
+    a page refresh nor a restart resets the quota. Each FreeQuota uses its own
+    `table`, so buckets with different capacities can share one database."""
+
+    def __init__(
+        self, path: str, capacity: int, period: float = 24 * 3600, table: str = "free_quota"
+    ):
+        self.capacity = capacity
+        self.rate = capacity / period  # tokens per second
+        self._table = table
+        self._conn = sqlite3.connect(
+            path, timeout=5.0, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} "
+            "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        # A full bucket is the same as no row; drop those to keep the table small.
+        self._conn.execute(
+            f"DELETE FROM {table} WHERE tokens + (? - updated) * ? >= ?",
+            (time.time(), self.rate, capacity),
+        )
+        self._lock = threading.Lock()
+
+    def _refill(self, key: str, now: float) -> float:
+        row = self._conn.execute(
+            f"SELECT tokens, updated FROM {self._table} WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return float(self.capacity)
+        tokens, updated = row
+        return min(self.capacity, tokens + (now - updated) * self.rate)
+
+    def _store(self, key: str, tokens: float, now: float) -> None:
+        self._conn.execute(
+            f"INSERT OR REPLACE INTO {self._table} (key, tokens, updated) VALUES (?, ?, ?)",
+            (key, tokens, now),
+        )
+
+    @contextmanager
+    def _update(self):
+        """Read-modify-write transaction. BEGIN IMMEDIATE takes SQLite's write lock up
+        front, so other processes can't interleave between the read and the write."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield time.time()
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def available(self, key: str) -> float:
+        with self._lock:
+            return self._refill(key, time.time())
+
+    def seconds_until_next(self, key: str) -> float:
+        """Time until the next whole request is available (0 if one is now, inf if
+        the free tier has no capacity)."""
+        tokens = self.available(key)
+        if tokens >= 1:
+            return 0.0
+        if self.rate <= 0:
+            return float("inf")
+        return (1 - tokens) / self.rate
+
+    def reserve(self, key: str) -> bool:
+        """Take one request if available. Checking and taking happen in one
+        transaction, so concurrent reruns can't both spend the last token."""
+        with self._update() as now:
+            tokens = self._refill(key, now)
+            if tokens < 1:
+                return False
+            self._store(key, tokens - 1, now)
+            return True
+
+    def refund(self, key: str) -> None:
+        """Give back a reserved request that didn't lead to an API call."""
+        with self._update() as now:
+            self._store(key, min(self.capacity, self._refill(key, now) + 1), now)
+
+
+@st.cache_resource
+def get_free_quota() -> FreeQuota:
+    return FreeQuota(QUOTA_STORE_PATH, FREE_DAILY_LIMIT)
+
+
+@st.cache_resource
+def get_ip_quota() -> FreeQuota:
+    return FreeQuota(QUOTA_STORE_PATH, IP_DAILY_LIMIT, table="ip_quota")
+
+
+def client_token() -> str:
+    """Per-browser key for the free quota, kept in the `client` query parameter so
+    it survives reloads. The server issues it; anything that isn't a token it could
+    have issued is replaced with a fresh one."""
+    token = st.query_params.get("client", "")
+    if not re.fullmatch(r"[0-9a-f]{32}", token):
+        token = uuid.uuid4().hex
+        st.query_params["client"] = token
+    return token
+
+
+def client_ip_key() -> str | None:
+    """Hash of the client IP for the per-IP throttle, or None when it's unknown. The
+    direct peer is used unless TRUST_FORWARDED_FOR is set; then it's the last
+    X-Forwarded-For hop, the one the trusted proxy appended."""
+    ip = getattr(st.context, "ip_address", None)
+    if TRUST_FORWARDED_FOR:
+        hops = [h.strip() for h in st.context.headers.get("X-Forwarded-For", "").split(",")]
+        ip = next((h for h in reversed(hops) if h), None) or ip
+    if not ip:
+        return None
+    return hashlib.blake2b(str(ip).encode("utf-8"), digest_size=16).hexdigest()
+
+
+free_quota = get_free_quota()
+ip_quota = get_ip_quota()
+
+# -------------------------
+# Premium unlocks (server-side)
+# -------------------------
+class PremiumUnlocks:
+    """Server-side record of premium unlocks: one random nonce per unlock, stored in
+    SQLite next to the free quota. A URL token is only honoured while its nonce is
+    here, and redeeming it swaps the nonce for a new one, so a copied URL works once
+    at most. Deleting a row revokes that unlock. Unlocks expire `ttl` seconds after
+    the code was entered."""
+
+    def __init__(self, path: str, ttl: float):
+        self.ttl = ttl
+        self._conn = sqlite3.connect(
+            path, timeout=5.0, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS premium_unlocks "
+            "(nonce TEXT PRIMARY KEY, unlocked REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "DELETE FROM premium_unlocks WHERE unlocked <= ?", (time.time() - ttl,)
+        )
+        self._lock = threading.Lock()
+
+    def issue(self) -> str:
+        nonce = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO premium_unlocks (nonce, unlocked) VALUES (?, ?)",
+                (nonce, time.time()),
+            )
+        return nonce
+
+    def rotate(self, nonce: str) -> str | None:
+        """Replace a live nonce with a fresh one for the same unlock; None if it is
+        unknown, expired or was already rotated (e.g. by whoever else had the URL)."""
+        fresh = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT unlocked FROM premium_unlocks WHERE nonce = ? AND unlocked > ?",
+                    (nonce, time.time() - self.ttl),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute("DELETE FROM premium_unlocks WHERE nonce = ?", (nonce,))
+                    self._conn.execute(
+                        "INSERT INTO premium_unlocks (nonce, unlocked) VALUES (?, ?)",
+                        (fresh, row[0]),
+                    )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return fresh if row is not None else None
+
+
+@st.cache_resource
+def get_premium_unlocks() -> PremiumUnlocks:
+    return PremiumUnlocks(QUOTA_STORE_PATH, ttl=PREMIUM_TOKEN_TTL)
+
+
+def _premium_signature(nonce: str) -> str:
+    return hmac.new(PREMIUM_CODE_DIGEST, nonce.encode("ascii"), "sha256").hexdigest()
+
+
+def premium_token() -> str:
+    """Proof of a new unlock, kept in the URL so a reload stays premium: a stored
+    nonce signed with the access-code digest, so changing the code also revokes
+    every token."""
+    nonce = premium_unlocks.issue()
+    return f"{nonce}.{_premium_signature(nonce)}"
+
+
+def redeem_premium_token(token: str | None) -> str | None:
+    """The replacement token for a valid one (its nonce is rotated), else None."""
+    if not token or PREMIUM_CODE_DIGEST is None:
+        return None
+    nonce, _, sig = token.partition(".")
+    if not re.fullmatch(r"[0-9a-f]{32}", nonce):
+        return None
+    if not hmac.compare_digest(sig, _premium_signature(nonce)):
+        return None
+    fresh = premium_unlocks.rotate(nonce)
+    return f"{fresh}.{_premium_signature(fresh)}" if fresh else None
+
+
+premium_unlocks = get_premium_unlocks()
+
+# -------------------------
+# Session state init
+# -------------------------
+if "is_premium" not in st.session_state:
+    # A reload starts a new session; a valid token from an earlier unlock carries over
+    # and is exchanged for a new one, so the URL it came from stops working.
+    token = redeem_premium_token(st.query_params.get("premium"))
+    st.session_state.is_premium = token is not None
+    if token is not None:
+        st.query_params["premium"] = token
+    elif "premium" in st.query_params:
+        del st.query_params["premium"]
+
+if "request_count" not in st.session_state:
+    # Requests made in this browser session (analytics); quota lives in free_quota.
+    st.session_state.request_count = 0
+
+if "client_key" not in st.session_state:
+    st.session_state.client_key = client_token()
+    st.session_state.ip_key = client_ip_key()
+
+if "chat_id" not in st.session_state:
+    st.session_state.chat_id = uuid.uuid4().hex
+
+if "chat_history" not in st.session_state:
+    # list[dict]: {"role": "user"/"assistant", "content": "..."}. Only the tail of
+    # the conversation; the full history is in the chat store.
+    st.session_state.chat_history = []
+
+if "chat_offset" not in st.session_state:
+    # Index (in the full conversation) of the first message in chat_history.
+    st.session_state.chat_offset = 0
+
+if "chat_trim_hold" not in st.session_state:
+    # New messages still to come before chat_history is trimmed again. "Load older
+    # messages" sets it, so the loaded pages aren't dropped by the very next message.
+    st.session_state.chat_trim_hold = 0
+
+if "chat_bubbles" not in st.session_state:
+    # Rendered HTML for each chat_history entry, kept in step with it. The history
+    # itself stays in API message format so it can be sent as-is.
+    st.session_state.chat_bubbles = []
+
+if "chat_summary" not in st.session_state:
+    # Summary of the conversation before message index chat_summary_upto, and the
+    # in-flight summarization as (future, upto) or None.
+    st.session_state.chat_summary = ""
+    st.session_state.chat_summary_upto = 0
+    st.session_state.chat_summary_job = None
+
+if "awaiting_reply" not in st.session_state:
+    st.session_state.awaiting_reply = False
+
+if "last_ttft_ms" not in st.session_state:
+    st.session_state.last_ttft_ms = None
+
+if "batch_jobs" not in st.session_state:
+    # list[dict]: {"id", "title", "labels", "sections", "submitted_at"} for this
+    # browser's Batch API submissions, including those from before a reload or
+    # restart; status and results live in the shared BatchJobs.
+    st.session_state.batch_jobs = get_batch_jobs().entries(st.session_state.client_key)
+
+if "first_used_at" not in st.session_state:
+    st.session_state.first_used_at = time.time()
+
+if "show_premium_popup" not in st.session_state:
+    st.session_state.show_premium_popup = False
+
+# Messages kept in session memory; older ones are archived in the chat store and can
+# be loaded back CHAT_PAGE_SIZE at a time.
+CHAT_MEMORY_MESSAGES = 40
+CHAT_PAGE_SIZE = 20
+
+# Only the most recent turns (user + assistant pairs) are replayed to the model,
+# so per-message prompt size stays flat instead of growing with the conversation.
+# The token budget also bounds it when individual messages are long (attachments).
+MAX_HISTORY_TURNS = 8
+MAX_HISTORY_TOKENS = 3000
+
+# Turns that leave the replay window are folded into a running summary sent in their
+# place. Summarizing waits until this many messages have dropped out, so it costs
+# one small background request per few turns rather than one per turn; until a
+# summary covers them, dropped messages are still replayed as they are.
+SUMMARY_CHUNK_MESSAGES = 8
+CHAT_SUMMARY_PROMPT = (
+    "You maintain a compact memory of a conversation between a user and an AI "
+    "assistant.\n"
+    "You receive the summary so far (possibly empty) and the messages that follow it.\n"
+    "Return an updated summary of at most 150 words keeping facts, names, decisions, "
+    "user preferences and open questions. Write plain sentences, no preamble."
+)
+
+CHAT_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": "You are a helpful, friendly AI assistant named SuperBrain.",
+}
+
+# Per-mode instructions. Everything that doesn't depend on the form goes here and
+# user prompts carry only the form fields, so each request starts with an identical
+# prefix that OpenAI can reuse from its prompt cache. Keep these free of timestamps,
+# names or other per-request values.
+SYSTEM_PROMPTS = {
+    "resume": (
+        "You are an expert HR and resume writer helping job seekers.\n"
+        "You receive the candidate's profile.\n"
+        "Do not invent fake experience. Be honest but positive.\n"
+        "Return a JSON object with these string fields:\n"
+        '"summary": a 3–4 line professional summary for the resume;\n'
+        '"bullets": 5–7 resume bullet points combining skills, projects and experience, '
+        'one per line, each starting with "- ";\n'
+        '"cover_letter": a 200–250 word cover letter tailored to the target role.'
+    ),
+    "blog": (
+        "You are an expert content writer and social media marketer.\n"
+        "You receive a content brief: type, topic, audience, length and extra instructions.\n"
+        "Write high-quality, original content that is helpful and engaging.\n"
+        "Avoid generic fluff; provide structure, value, and a clear message."
+    ),
+    "email": (
+        "You are an expert at writing professional, polite emails.\n"
+        "You receive the purpose, recipient, context and tone of an email.\n"
+        "Write a clear, polite, professional email.\n"
+        "Include both a subject line and the email body."
+    ),
+    "code": (
+        "You are a patient senior developer and teacher.\n"
+        "You receive a language, the kind of help needed and the code or problem.\n"
+        "Explain step by step, then give the improved or fixed code if relevant.\n"
+        "Add comments in the code to help a beginner understand."
+    ),
+}
+
+# Sections of the resume JSON reply, as (key, heading), in display order.
+RESUME_SECTIONS = (
+    ("summary", "Professional Summary"),
+    ("bullets", "Resume Bullet Points"),
+    ("cover_letter", "Cover Letter"),
+)
+
+# User prompts: the form fields of each mode, in a fixed layout. Built once here so
+# the handlers only substitute values.
+PROMPT_TEMPLATES = {
+    "resume": string.Template(
+        "Name: $name\n"
+        "Target Role: $role\n"
+        "Skills: $skills\n"
+        "Projects: $projects\n"
+        "Experience: $experience\n"
+        "Extra Info: $extras\n"
+        "Preferred tone: $tone\n"
+    ),
+    "blog": string.Template(
+        "Content type: $content_type\n"
+        "Topic: $topic\n"
+        "Target audience: $audience\n"
+        "Length: $length\n"
+        "Extra instructions: $extras\n"
+    ),
+    "email": string.Template(
+        "Purpose: $purpose\n"
+        "Recipient: $recipient\n"
+        "Context: $context\n"
+        "Tone: $tone\n"
+    ),
+    "code": string.Template(
+        "Language: $language\n"
+        "Help type: $help_type\n"
+        "Code or description:\n"
+        "$code\n"
+    ),
+}
+
+# -------------------------
+# Helper functions
+# -------------------------
+def free_buckets() -> list[tuple[FreeQuota, str]]:
+    """Buckets a free request is charged to: this browser's and, when the per-IP
+    throttle is enabled and the address is known, its IP's."""
+    buckets = [(free_quota, st.session_state.client_key)]
+    if IP_DAILY_LIMIT > 0 and st.session_state.ip_key:
+        buckets.append((ip_quota, st.session_state.ip_key))
+    return buckets
+
+
+def requests_remaining() -> int:
+    """Whole free-tier requests this client can make right now."""
+    return int(min(quota.available(key) for quota, key in free_buckets()))
+
+
+def format_wait(seconds: float) -> str:
+    """Human-readable duration, rounded up to whole minutes."""
+    minutes = max(int(-(-seconds // 60)), 1)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours} h {minutes} min" if hours else f"{minutes} min"
+
+
+def out_of_requests() -> bool:
+    """True when a free user has no request available right now. Renders nothing, so
+    pages can check it once per run to disable their submit controls."""
+    return not st.session_state.is_premium and requests_remaining() == 0
+
+
+def warn_limit_reached() -> None:
+    wait = max(quota.seconds_until_next(key) for quota, key in free_buckets())
+    if wait == float("inf"):
+        st.warning(
+            "⚠️ No free requests are available on this server.\n\n"
+            "Upgrade to **Premium** for unlimited access."
+        )
+        return
+    if free_quota.available(st.session_state.client_key) >= 1:
+        st.warning(
+            "⚠️ The free requests for your network are used up. The next one is "
+            f"available in about **{format_wait(wait)}**.\n\n"
+            "Upgrade to **Premium** for unlimited access."
+        )
+        return
+    st.warning(
+        f"⚠️ You've used all **{FREE_DAILY_LIMIT}** free requests. The next one "
+        f"is available in about **{format_wait(wait)}**.\n\n"
+        "Upgrade to **Premium** for unlimited access."
+    )
+
+
+def reserve_request() -> bool:
+    """Reserve one free request, or warn and return False when none is available.
+    Every successful reservation must be settled by `request_reservation()`."""
+    if st.session_state.is_premium:
+        return True
+
+    taken = []
+    for quota, key in free_buckets():
+        if not quota.reserve(key):
+            for taken_quota, taken_key in taken:
+                taken_quota.refund(taken_key)
+            warn_limit_reached()
+            return False
+        taken.append((quota, key))
+    return True
+
+
+def register_request() -> None:
+    """Count a request that reached the API in the session analytics (the daily
+    slot was already taken by `reserve_request`)."""
+    if not st.session_state.is_premium:
+        st.session_state.request_count += 1
+
+
+def release_request() -> None:
+    """Refund a reserved slot that wasn't used (cache hit or failed call)."""
+    if not st.session_state.is_premium:
+        for quota, key in free_buckets():
+            quota.refund(key)
+
+
+@contextmanager
+def request_reservation():
+    """Settle a slot taken by `reserve_request`. Yields a callback to invoke once the
+    API has actually been called; otherwise the slot is refunded on exit, so cached
+    answers and errors don't use up the free limit."""
+    used = []
+    try:
+        yield lambda: used.append(True)
+    finally:
+        if used:
+            register_request()
+        else:
+            release_request()
+
+
+def _hash_messages(messages: list) -> bytes:
+    """Cache-key hasher for message lists: one blake2b pass over compact JSON instead
+    of Streamlit's reflective walk through every nested dict."""
+    raw = json.dumps(messages, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    return hashlib.blake2b(raw, digest_size=16).digest()
+
+
+@st.cache_data(ttl="1h", max_entries=500, show_spinner=False, hash_funcs={list: _hash_messages})
+def _cached_completion(
+    model: str,
+    messages: list[dict],
+    params: dict,
+    n: int = 1,
+    persist: bool = False,
+    _on_miss=None,
+    _lookup=None,
+) -> list[str]:
+    """Memoized chat completion returning `n` choices. The body only runs on a cache
+    miss, so `_on_miss` (excluded from the cache key by its leading underscore) fires
+    once per real API call. With `persist`, misses fall through to the on-disk
+    generation store before calling the API. `_lookup` is the last resort before the
+    API: a callable that may return outputs (e.g. from the semantic cache) or None."""
+    if persist:
+        key = GenerationStore.make_key(model, messages, n, params)
+        stored = generation_store.get(key)
+        if stored is not None:
+            return stored
+
+    if _lookup is not None:
+        found = _lookup()
+        if found is not None:
+            return found
+
+    rate_limiter.acquire()
+    response = get_openai_client().chat.completions.create(
+        model=model,
+        messages=messages,
+        n=n,
+        **params,
+    )
+    outputs = [choice.message.content for choice in response.choices]
+    if persist:
+        generation_store.set(key, outputs)
+    if _on_miss is not None:
+        _on_miss()
+    return outputs
+
+
+def call_openai_variants(
+    system_prompt: str,
+    user_prompt: str,
+    n: int,
+    mode: str,
+    persist: bool = False,
+    lookup=None,
+) -> list[str] | None:
+    """Generate `n` alternative completions in a single request (`n` parameter): the
+    prompt is sent and billed once and it counts as one request against the limit.
+
+    Only pass `persist=True` for prompts without personal details; persisted results
+    are written to disk and reused across restarts. `lookup` is only consulted when
+    the exact caches miss (see `_cached_completion`)."""
+    if not reserve_request():
+        return None
+
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+    with request_reservation() as mark_used:
+        try:
+            return _cached_completion(
+                MODEL,
+                messages,
+                generation_params(mode),
+                n,
+                persist,
+                _on_miss=mark_used,
+                _lookup=lookup,
+            )
+        except Exception as e:
+            # Failed requests are refunded by the reservation, not shown as content.
+            st.error(f"❌ {describe_api_error(e)}")
+            return None
+
+
+@st.cache_data(ttl="1h", max_entries=1000, show_spinner=False)
+def embed_text(text: str) -> np.ndarray:
+    rate_limiter.acquire()
+    response = get_openai_client().embeddings.create(model=EMBEDDING_MODEL, input=text)
+    return np.asarray(response.data[0].embedding, dtype=np.float32)
+
+
+def similar_outputs(namespace: tuple, text: str) -> list[str] | None:
+    """Outputs of an earlier request whose free text was nearly identical to `text`
+    and whose structured fields (`namespace`) matched exactly. Costs an embedding,
+    no completion; any embedding failure just counts as a miss."""
+    try:
+        return semantic_cache.get(namespace, embed_text(text))
+    except Exception:
+        return None
+
+
+def remember_outputs(namespace: tuple, text: str, outputs: list[str]) -> None:
+    try:
+        semantic_cache.set(namespace, embed_text(text), outputs)
+    except Exception:
+        pass
+
+
+def describe_api_error(error: Exception) -> str:
+    """User-facing message for a request that failed after the SDK's retries."""
+    import openai
+
+    if isinstance(error, openai.RateLimitError):
+        return "OpenAI is rate limiting requests right now. Please try again in a minute."
+    if isinstance(error, openai.APITimeoutError):
+        return "OpenAI took too long to respond. Please try again."
+    if isinstance(error, openai.APIConnectionError):
+        return "Couldn't reach OpenAI. Check the connection and try again."
+    return f"Error calling OpenAI API: {error}"
+
+
+async def _acompletion(model: str, system_prompt: str, user_prompt: str, params: dict) -> str:
+    await rate_limiter.acquire_async()
+    response = await get_async_openai_client().chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ],
+        **params,
+    )
+    return response.choices[0].message.content
+
+
+def stream_chat_completion(messages: list[dict], params: dict, on_start=None):
+    """Yield the assistant reply incrementally as chunks arrive. `on_start` is called
+    as soon as OpenAI has accepted the request: from then on it is billed even if the
+    run is interrupted mid-stream. The time to the first non-empty token is kept in
+    `st.session_state.last_ttft_ms`."""
+    rate_limiter.acquire()
+    started = time.perf_counter()
+    stream = get_openai_client().chat.completions.create(
+        model=MODEL,
+        messages=messages,
+        stream=True,
+        **params,
+    )
+    if on_start is not None:
+        on_start()
+    first_token = True
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            if first_token:
+                st.session_state.last_ttft_ms = (time.perf_counter() - started) * 1000
+                first_token = False
+            yield chunk.choices[0].delta.content
+
+
+def stream_completion(messages: list[dict], mode: str, on_miss, persist: bool = False):
+    """Stream a reply, answering repeats of the same messages from cache. `on_miss`
+    is called once a real API call has started, before the first chunk is read, so a
+    rerun or stop mid-stream (Streamlit raises those as BaseException) can't refund a
+    request that OpenAI bills. With `persist`, the on-disk generation store is
+    consulted and updated as well."""
+    params = generation_params(mode)
+    key = GenerationStore.make_key(MODEL, messages, 1, params)
+    stored = recent_generations.get(key)
+    if stored is None and persist:
+        stored = generation_store.get(key)
+    if stored is not None:
+        yield stored[0]
+        return
+
+    parts = []
+    for delta in stream_chat_completion(messages, params, on_start=on_miss):
+        parts.append(delta)
+        yield delta
+
+    reply = "".join(parts)
+    recent_generations.set(key, [reply])
+    if persist:
+        generation_store.set(key, [reply])
+
+
+def call_openai_stream(system_prompt: str, user_prompt: str, mode: str, persist: bool = False):
+    """Single completion for `st.write_stream`: text is shown as it is generated
+    instead of after the whole completion. Identical prompts are served from cache
+    and don't count against the free limit. Yields nothing when the free limit is
+    reached."""
+    if not reserve_request():
+        return
+
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+    with request_reservation() as mark_used:
+        try:
+            yield from stream_completion(messages, mode, mark_used, persist)
+        except Exception as e:
+            st.error(f"❌ {describe_api_error(e)}")
+
+
+def submit_batch(system_prompt: str, user_prompts: list[str], mode: str, n: int = 1) -> str:
+    """Send the prompts to OpenAI's Batch API as one JSONL file and return the batch
+    id (`queue_batch` starts tracking it). Batch requests cost half as much and don't
+    use the synchronous rate limit, but results can take up to 24 hours."""
+    lines = [
+        json.dumps(
+            {
+                "custom_id": f"request-{i}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": MODEL,
+                    "messages": [
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt},
+                    ],
+                    "n": n,
+                    **generation_params(mode),
+                },
+            },
+            ensure_ascii=False,
+        )
+        for i, user_prompt in enumerate(user_prompts)
+    ]
+    client = get_openai_client()
+    batch_file = client.files.create(
+        file=("superbrain_batch.jsonl", "\n".join(lines).encode("utf-8")),
+        purpose="batch",
+    )
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+    )
+    return batch.id
+
+
+def queue_batch(
+    title: str,
+    labels: list[str],
+    system_prompt: str,
+    user_prompts: list[str],
+    mode: str,
+    n: int = 1,
+    sections=None,
+) -> None:
+    """Submit a background batch for this session; `labels` name each prompt's
+    output in the Batch inbox, and `sections` (see `write_sections`) marks JSON
+    outputs to split into headed blocks. Counts as one request against the free limit."""
+    if not reserve_request():
+        return
+
+    with request_reservation() as mark_used:
+        try:
+            batch_id = submit_batch(system_prompt, user_prompts, mode, n)
+        except Exception as e:
+            st.error(f"❌ Error submitting batch: {e}")
+            return
+        mark_used()
+
+    entry = {
+        "title": title,
+        "labels": labels,
+        "sections": sections,
+        "submitted_at": time.strftime("%H:%M UTC", time.gmtime()),
+    }
+    get_batch_jobs().track(batch_id, st.session_state.client_key, entry)
+    st.session_state.batch_jobs.append({"id": batch_id, **entry})
+    st.success("Queued! The result will appear in the 📥 Batch inbox below, usually within minutes.")
+
+
+# Bubble markup per role; only the escaped message body is filled in.
+USER_BUBBLE = '<div class="chat-label chat-label-user">You</div><div class="chat-bubble-user">%s</div>'
+AI_BUBBLE = '<div class="chat-label chat-label-ai">SuperBrain AI</div><div class="chat-bubble-ai">%s</div>'
+
+
+def render_bubble(role: str, content: str) -> str:
+    """HTML for one chat message: speaker label plus bubble. The content is escaped,
+    so messages (and uploaded files) can't inject markup into the page."""
+    body = html.escape(content).replace("\n", "<br>")
+    return (USER_BUBBLE if role == "user" else AI_BUBBLE) % body
+
+
+@st.cache_resource(show_spinner=False)
+def _token_encoder():
+    """tiktoken encoding for MODEL (tiktoken is in requirements.txt), or None when it
+    isn't installed or its encoding file can't be fetched; callers then fall back to
+    an estimate rather than fail."""
+    try:
+        import tiktoken
+
+        return tiktoken.encoding_for_model(MODEL)
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Token count of `text`; about four characters per token without tiktoken."""
+    encoder = _token_encoder()
+    if encoder is None:
+        return len(text) // 4 + 1
+    return len(encoder.encode(text))
+
+
+def recent_history() -> list[dict]:
+    """The tail of the conversation that is replayed to the model: at most
+    MAX_HISTORY_TURNS turns and, walking back from the newest message, no more than
+    MAX_HISTORY_TOKENS tokens. The newest message is always included."""
+    window = st.session_state.chat_history[-2 * MAX_HISTORY_TURNS:]
+    kept = []
+    total = 0
+    for m in reversed(window):
+        total += count_tokens(m["content"])
+        if kept and total > MAX_HISTORY_TOKENS:
+            break
+        kept.append(m)
+    kept.reverse()
+    return kept
+
+
+def summary_messages(window_start: int) -> list[dict]:
+    """The older context to send ahead of the replay window that starts at
+    `window_start` (an index in the full conversation): the summary system message,
+    once there is one, then every message before the window the summary doesn't
+    cover yet, replayed verbatim so nothing drops out of the model's view while a
+    summary is pending. Also folds finished background summaries in and, once enough
+    messages are unsummarized, starts the next one; its result is used from the next
+    turn on."""
+    ss = st.session_state
+    if ss.chat_summary_job is not None and ss.chat_summary_job[0].done():
+        future, upto = ss.chat_summary_job
+        ss.chat_summary_job = None
+        try:
+            ss.chat_summary = future.result()
+            ss.chat_summary_upto = upto
+        except Exception:
+            pass  # try again with the next turn
+
+    unsummarized = window_start - ss.chat_summary_upto
+    if ss.chat_summary_job is None and unsummarized >= SUMMARY_CHUNK_MESSAGES:
+        dropped = chat_store.load(ss.chat_id, ss.chat_summary_upto, window_start)
+        prompt = (
+            f"Summary so far:\n{ss.chat_summary}\n\nMessages:\n"
+            + "\n".join(f"{m['role']}: {m['content']}" for m in dropped)
+        )
+        future = submit_async(
+            _acompletion(MODEL, CHAT_SUMMARY_PROMPT, prompt, generation_params("chat_summary"))
+        )
+        ss.chat_summary_job = (future, window_start)
+
+    older = []
+    if ss.chat_summary:
+        older.append(
+            {"role": "system", "content": f"Summary of the earlier conversation:\n{ss.chat_summary}"}
+        )
+    if ss.chat_summary_upto < window_start:
+        older.extend(chat_store.load(ss.chat_id, ss.chat_summary_upto, window_start))
+    return older
+
+
+def add_chat_message(role: str, content: str) -> None:
+    """Append a message and render its bubble once; completed messages are never
+    re-rendered on later runs. The message is archived in the chat store and the
+    in-memory history is trimmed to CHAT_MEMORY_MESSAGES. After older pages were
+    loaded back, trimming waits for CHAT_PAGE_SIZE new messages."""
+    idx = st.session_state.chat_offset + len(st.session_state.chat_history)
+    chat_store.append(st.session_state.chat_id, idx, role, content)
+    st.session_state.chat_history.append({"role": role, "content": content})
+    st.session_state.chat_bubbles.append(render_bubble(role, content))
+
+    if st.session_state.chat_trim_hold:
+        st.session_state.chat_trim_hold -= 1
+        return
+    overflow = len(st.session_state.chat_history) - CHAT_MEMORY_MESSAGES
+    if overflow > 0:
+        del st.session_state.chat_history[:overflow]
+        del st.session_state.chat_bubbles[:overflow]
+        st.session_state.chat_offset += overflow
+
+
+def load_older_messages() -> None:
+    """Bring the previous CHAT_PAGE_SIZE archived messages back into view."""
+    stop = st.session_state.chat_offset
+    start = max(stop - CHAT_PAGE_SIZE, 0)
+    older = chat_store.load(st.session_state.chat_id, start, stop)
+    st.session_state.chat_history[:0] = older
+    st.session_state.chat_bubbles[:0] = [render_bubble(m["role"], m["content"]) for m in older]
+    st.session_state.chat_offset = start
+    st.session_state.chat_trim_hold = CHAT_PAGE_SIZE
+
+
+def submit_chat_message() -> None:
+    """`st.chat_input` callback: store the user's message (plus any attached file)
+    and flag it for an answer on the rerun that follows."""
+    user_message = st.session_state.chat_prompt
+    if not user_message or not user_message.strip():
+        return
+
+    uploaded_file = st.session_state.get("chat_file_uploader")
+    if uploaded_file is not None:
+        attached_text = uploaded_file.getvalue().decode("utf-8", errors="ignore")
+        user_message += f"\n\n[Attached file: {uploaded_file.name}]\n{attached_text[:4000]}"
+
+    add_chat_message("user", user_message)
+    st.session_state.awaiting_reply = True
+
+
+def clear_chat() -> None:
+    chat_store.delete(st.session_state.chat_id)
+    st.session_state.chat_history = []
+    st.session_state.chat_bubbles = []
+    st.session_state.chat_offset = 0
+    st.session_state.chat_trim_hold = 0
+    st.session_state.chat_summary = ""
+    st.session_state.chat_summary_upto = 0
+    st.session_state.chat_summary_job = None
+
+
+def build_transcript() -> str:
+    """Create a plain text transcript of the whole chat, archived messages included."""
+    if not st.session_state.chat_history:
+        return "No messages yet."
+    lines = []
+    for m in chat_store.load(st.session_state.chat_id):
+        speaker = "You" if m["role"] == "user" else APP_NAME
+        lines.append(f"{speaker}: {m['content']}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def write_sections(output: str, sections) -> None:
+    """Render a JSON reply as one headed block per `(key, heading)` section. Output
+    that isn't the expected JSON (e.g. cut off at the token limit) is shown as is."""
+    try:
+        data = json.loads(output)
+    except (TypeError, ValueError):
+        st.write(output)
+        return
+    if not isinstance(data, dict):
+        st.write(output)
+        return
+    for key, heading in sections:
+        value = data.get(key, "")
+        if isinstance(value, list):
+            value = "\n".join(f"- {item}" for item in value)
+        st.markdown(f"#### {heading}")
+        st.write(value)
+
+
+def create_pdf_from_text(text: str) -> bytes | None:
+    """Create a PDF bytes object from text, if reportlab is available."""
+    if not HAS_REPORTLAB:
+        return None
+
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+    width, height = letter
+    x_margin, y_margin = 40, 40
+    y = height - y_margin
+
+    for line in text.splitlines():
+        wrapped_lines = textwrap.wrap(line, 90) or [""]
+        for wline in wrapped_lines:
+            c.drawString(x_margin, y, wline)
+            y -= 14
+            if y < y_margin:
+                c.showPage()
+                y = height - y_margin
+
+    c.save()
+    pdf_bytes = buffer.getvalue()
+    buffer.close()
+    return pdf_bytes
+
+
+def create_jpg_from_text(text: str) -> bytes:
+    """Create a simple JPG image containing the chat transcript."""
+    lines = text.splitlines() or [""]
+    max_line_len = max(len(line) for line in lines)
+    char_w, char_h = 7, 14
+
+    width = min(max_line_len * char_w + 40, 2000)
+    height = min(len(lines) * (char_h + 4) + 40, 4000)
+
+    img = Image.new("RGB", (max(width, 200), max(height, 100)), "white")
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.load_default()
+
+    y = 20
+    for line in lines:
+        draw.text((20, y), line, fill="black", font=font)
+        y += char_h + 4
+
+    buf = BytesIO()
+    img.save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+# -------------------------
+# Global styles (chat bubbles, etc.)
+# -------------------------
+# The stylesheets live next to this file; styles-dark.css holds only the overrides
+# layered on top of styles.css.
+STYLES_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def build_style_tag(*blocks: str) -> str:
+    """Merge CSS blocks into one `<style>` tag with comments and layout whitespace
+    stripped, so each rerun ships a fraction of the bytes."""
+    css = "".join(blocks)
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,])\s*", r"\1", css)
+    return f"<style>{css.strip()}</style>"
+
+
+@st.cache_resource(show_spinner=False)
+def style_tag(*names: str) -> str:
+    """One style element from the given stylesheets, read and minified once per process."""
+    blocks = []
+    for name in names:
+        with open(os.path.join(STYLES_DIR, name), encoding="utf-8") as f:
+            blocks.append(f.read())
+    return build_style_tag(*blocks)
+
+
+THEME_STYLESHEETS = {
+    "Light": ("styles.css",),
+    "Dark": ("styles.css", "styles-dark.css"),
+}
+
+
+# -------------------------
+# Tool pages (one runs per rerun, see MAIN MODES)
+# -------------------------
+# 1) GENERAL CHAT — ChatGPT-style (history on top, input at bottom)
+@st.fragment
+def render_general_chat() -> None:
+    """Conversation UI. Runs as a fragment, so sending a message or clearing the
+    chat reruns only this block instead of the whole app."""
+    # Optional: file attachment for context (merged in by submit_chat_message)
+    st.file_uploader(
+        "Attach a text/code file for SuperBrain to read (optional)",
+        type=["txt", "md", "py", "csv", "json"],
+        key="chat_file_uploader",
+    )
+
+    # Scrollable chat history container (includes a just-submitted message)
+    st.markdown(
+        "<div id='chat-container'>",
+        unsafe_allow_html=True,
+    )
+
+    if st.session_state.chat_offset:
+        st.button("Load older messages", on_click=load_older_messages)
+
+    if not st.session_state.chat_history:
+        st.info("Start the conversation by typing a message below.")
+    else:
+        # One element for the whole history instead of one per message; every
+        # bubble starts on its own line so it opens a fresh HTML block.
+        st.markdown("\n".join(st.session_state.chat_bubbles), unsafe_allow_html=True)
+
+    st.markdown("</div>", unsafe_allow_html=True)
+
+    # Placeholder for typing indicator / streamed reply (below the last message)
+    typing_placeholder = st.empty()
+
+    # Auto-scroll to bottom of chat container
+    st.markdown(
+        """
+        <script>
+        const chatContainer = document.getElementById('chat-container');
+        if (chatContainer) {
+            chatContainer.scrollTop = chatContainer.scrollHeight;
+        }
+        </script>
+        """,
+        unsafe_allow_html=True,
+    )
+
+    # Answer a message queued by the chat input. Only the new reply is drawn
+    # incrementally; the history above is already on screen.
+    replied = False
+    if st.session_state.awaiting_reply:
+        st.session_state.awaiting_reply = False
+
+        # Show typing indicator bubble above the upcoming AI message
+        with typing_placeholder:
+            st.markdown(
+                """
+                <div class="chat-label chat-label-ai">SuperBrain AI</div>
+                <div class="typing-bubble">
+                    <span class="typing-dots">
+                        <span>.</span><span>.</span><span>.</span>
+                    </span>
+                </div>
+                """,
+                unsafe_allow_html=True,
+            )
+
+        # History is already stored in API message format, so the payload is the
+        # system prompt (a stable prefix), the summary of turns older than the window
+        # (once there is one) plus any it doesn't cover yet, and the recent turns,
+        # new message included.
+        recent = recent_history()
+        window_start = st.session_state.chat_offset + len(st.session_state.chat_history) - len(recent)
+        messages = [CHAT_SYSTEM_MESSAGE, *summary_messages(window_start), *recent]
+
+        if reserve_request():
+            with request_reservation() as mark_used:
+                try:
+                    # Stream tokens into the AI bubble; the typing dots stay up until
+                    # the first token arrives. A conversation identical to an earlier
+                    # one is answered from cache.
+                    parts = []
+                    for delta in stream_completion(messages, "chat", mark_used):
+                        parts.append(delta)
+                        typing_placeholder.markdown(
+                            render_bubble("assistant", "".join(parts)),
+                            unsafe_allow_html=True,
+                        )
+                    reply = "".join(parts)
+                    add_chat_message("assistant", reply)
+                    replied = True
+                except Exception as e:
+                    typing_placeholder.empty()
+                    st.error(f"❌ {describe_api_error(e)}")
+        else:
+            typing_placeholder.empty()
+
+    st.write("")  # small spacer
+
+    # Footer row: chat actions + downloads
+    with st.container():
+        col_input = st.columns([1, 1, 1, 1])
+        col_input[0].button("Clear Chat", on_click=clear_chat)
+        # download buttons in same footer row; the transcript is built once and
+        # shared by every export format
+        transcript = build_transcript() if st.session_state.chat_history else ""
+
+        if transcript:
+            txt_data = transcript.encode("utf-8")
+            col_input[1].download_button(
+                "⬇️ TXT",
+                data=txt_data,
+                file_name="superbrain_chat.txt",
+                mime="text/plain",
+            )
+
+            # For PDF, only if reportlab installed
+            if HAS_REPORTLAB:
+                pdf_bytes = create_pdf_from_text(transcript)
+                if pdf_bytes:
+                    col_input[2].download_button(
+                        "⬇️ PDF",
+                        data=pdf_bytes,
+                        file_name="superbrain_chat.pdf",
+                        mime="application/pdf",
+                    )
+            else:
+                col_input[2].markdown(
+                    "<small>PDF export needs `reportlab` installed.</small>",
+                    unsafe_allow_html=True,
+                )
+
+    # Extra row for JPG export if history exists
+    if transcript:
+        jpg_bytes = create_jpg_from_text(transcript)
+        st.download_button(
+            "⬇️ JPG (chat snapshot)",
+            data=jpg_bytes,
+            file_name="superbrain_chat.jpg",
+            mime="image/jpeg",
+        )
+
+    # Input at the bottom (ChatGPT-style). Submitting doesn't rerun on keystrokes
+    # and clears itself; the callback queues the message for the next fragment run.
+    locked = out_of_requests()
+    if locked:
+        warn_limit_reached()
+    st.chat_input(
+        "Type your message", key="chat_prompt", on_submit=submit_chat_message, disabled=locked
+    )
+
+    if replied and not st.session_state.is_premium:
+        # Free users' usage counter lives in the sidebar, outside the fragment.
+        st.rerun()
+
+
+def render_chat_page() -> None:
+    """General Chat page: header plus the chat fragment."""
+    st.subheader("💬 Chat with SuperBrain")
+    render_general_chat()
+
+
+# 2) RESUME & COVER LETTER
+def render_resume_page() -> None:
+    """Resume & Cover Letter tool."""
+    st.subheader("📄 Resume & Cover Letter Assistant")
+
+    locked = out_of_requests()
+    if locked:
+        warn_limit_reached()
+
+    # Inputs are batched in a form so typing doesn't rerun the whole app.
+    with st.form("resume_form"):
+        name = st.text_input("Your Name")
+        role = st.text_input("Target Role (e.g., Python Developer)")
+        skills = st.text_area("Skills (comma separated)")
+        projects = st.text_area("Projects (briefly describe)")
+        experience = st.text_area("Internships / Experience")
+        extras = st.text_area("Extra info (certificates, hackathons, achievements)")
+        tone = st.selectbox(
+            "Tone",
+            ["Professional", "Friendly professional", "Very formal"],
+        )
+        submitted = st.form_submit_button("Generate Resume Summary & Cover Letter", disabled=locked)
+
+    if submitted:
+        if not role.strip():
+            st.warning("Please provide at least a target job role.")
+        else:
+            profile = PROMPT_TEMPLATES["resume"].substitute(
+                name=name,
+                role=role,
+                skills=skills,
+                projects=projects,
+                experience=experience,
+                extras=extras,
+                tone=tone,
+            )
+            # All three sections come from one JSON-mode request, so the profile is
+            # sent and billed once.
+            if economy_mode:
+                queue_batch(
+                    f"Resume for {role}",
+                    ["Resume"],
+                    SYSTEM_PROMPTS["resume"],
+                    [profile],
+                    "resume",
+                    sections=RESUME_SECTIONS,
+                )
+                outputs = None
+            else:
+                outputs = call_openai_variants(SYSTEM_PROMPTS["resume"], profile, 1, "resume")
+            if outputs:
+                st.subheader("Generated Content")
+                write_sections(outputs[0], RESUME_SECTIONS)
+
+
+# 3) BLOG / SOCIAL POST WRITER
+def render_blog_page() -> None:
+    """Blog / social post writer."""
+    st.subheader("✍️ Blog & Social Media Content Writer")
+
+    locked = out_of_requests()
+    if locked:
+        warn_limit_reached()
+
+    with st.form("blog_form"):
+        content_type = st.selectbox(
+            "Content Type",
+            ["Blog Post", "LinkedIn Post", "Instagram Caption", "Twitter / X Thread"],
+        )
+        topic = st.text_input("Topic / Title")
+        audience = st.text_input("Target Audience (e.g., freshers, small business owners)")
+        length = st.selectbox("Length", ["Short", "Medium", "Long"])
+        extras = st.text_area("Extra instructions (tone, call to action, etc.)")
+        variants = st.number_input(
+            "Variants",
+            min_value=1,
+            max_value=5,
+            value=1,
+            help="Alternative drafts, generated together in one request.",
+        )
+        submitted = st.form_submit_button("Generate Content", disabled=locked)
+
+    if submitted:
+        if not topic.strip():
+            st.warning("Please provide a topic or title.")
+        else:
+            prompt = PROMPT_TEMPLATES["blog"].substitute(
+                content_type=content_type,
+                topic=topic,
+                audience=audience,
+                length=length,
+                extras=extras,
+            )
+            blog_mode = f"blog_{length.lower()}"
+            if economy_mode:
+                queue_batch(
+                    f"{content_type}: {topic}",
+                    [content_type],
+                    SYSTEM_PROMPTS["blog"],
+                    [prompt],
+                    blog_mode,
+                    int(variants),
+                )
+                outputs = None
+            else:
+                # A near-identical brief (same type, length and variant count, free
+                # text differing only in wording) is answered without a completion.
+                # The semantic lookup costs an embedding, so it only runs once the
+                # exact caches have missed.
+                namespace = (blog_mode, content_type, int(variants))
+                brief = "\n".join((topic, audience, extras))
+                lookups = []
+
+                def lookup():
+                    found = similar_outputs(namespace, brief)
+                    lookups.append(found is not None)
+                    return found
+
+                outputs = call_openai_variants(
+                    SYSTEM_PROMPTS["blog"],
+                    prompt,
+                    int(variants),
+                    blog_mode,
+                    persist=True,
+                    lookup=lookup,
+                )
+                if lookups == [True]:
+                    st.caption("♻️ Reused the answer to a near-identical earlier request.")
+                elif lookups and outputs:
+                    remember_outputs(namespace, brief, outputs)
+            if outputs:
+                st.subheader("Generated Content")
+                if len(outputs) == 1:
+                    st.write(outputs[0])
+                else:
+                    tabs = st.tabs([f"Variant {i}" for i in range(1, len(outputs) + 1)])
+                    for tab, output in zip(tabs, outputs):
+                        with tab:
+                            st.write(output)
+
+
+# 4) EMAIL WRITER
+def render_email_page() -> None:
+    """Professional email writer."""
+    st.subheader("📧 Professional Email Writer")
+
+    locked = out_of_requests()
+    if locked:
+        warn_limit_reached()
+
+    with st.form("email_form"):
+        email_purpose = st.selectbox(
+            "Email Purpose",
+            [
+                "Job Application",
+                "Follow-up after Interview",
+                "Cold Email to Client",
+                "Networking / Connection Request",
+                "General Professional Email",
+            ],
+        )
+        to_whom = st.text_input("Recipient (e.g., HR, Manager, Client)")
+        context = st.text_area("Context or Details (what is this email about?)")
+        style = st.selectbox("Tone", ["Formal", "Semi-formal", "Friendly professional"])
+        submitted = st.form_submit_button("Generate Email", disabled=locked)
+
+    if submitted:
+        if not context.strip():
+            st.warning("Please provide some context so the email is accurate.")
+        else:
+            prompt = PROMPT_TEMPLATES["email"].substitute(
+                purpose=email_purpose, recipient=to_whom, context=context, tone=style
+            )
+            if economy_mode:
+                queue_batch(
+                    f"{email_purpose} email", ["Email Draft"], SYSTEM_PROMPTS["email"], [prompt], "email"
+                )
+            else:
+                st.subheader("Email Draft")
+                st.write_stream(call_openai_stream(SYSTEM_PROMPTS["email"], prompt, "email"))
+
+
+# 5) CODE HELPER
+def render_code_page() -> None:
+    """Code helper."""
+    st.subheader("💻 Code Helper")
+
+    locked = out_of_requests()
+    if locked:
+        warn_limit_reached()
+
+    with st.form("code_form"):
+        language = st.selectbox(
+            "Language",
+            ["Python", "JavaScript", "C++", "Java", "Other"],
+        )
+        help_type = st.selectbox(
+            "What do you need?",
+            ["Explain code", "Fix bug", "Write new function", "Optimize / Refactor"],
+        )
+        code_or_desc = st.text_area(
+            "Paste your code or describe the problem", height=200
+        )
+        submitted = st.form_submit_button("Get Coding Help", disabled=locked)
+
+    if submitted:
+        if not code_or_desc.strip():
+            st.warning("Please paste some code or description.")
+        else:
+            prompt = PROMPT_TEMPLATES["code"].substitute(
+                language=language, help_type=help_type, code=code_or_desc
+            )
+            st.subheader("Help & Solution")
+            # Not persisted: pasted code often carries credentials or internal hostnames.
+            st.write_stream(call_openai_stream(SYSTEM_PROMPTS["code"], prompt, "code"))
+
+
+# 6) USAGE ANALYTICS
+def render_analytics_page() -> None:
+    """Session-level usage analytics."""
+    st.subheader("📊 Session Analytics")
+
+    total_requests = st.session_state.request_count
+    first_used = st.session_state.first_used_at
+
+    # One element per card: a separate markdown "<div>" before and after a widget
+    # doesn't wrap it (each markdown call is its own element), a keyed container does.
+    col1, col2, col3 = st.columns(3)
+    with col1.container(key="metric-card-total"):
+        st.metric("Total Requests This Session", total_requests)
+    with col2.container(key="metric-card-plan"):
+        st.metric(
+            "Plan",
+            "Premium" if st.session_state.is_premium else "Free",
+        )
+    with col3.container(key="metric-card-first-used"):
+        st.metric(
+            "First used at (UTC)",
+            time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(first_used)),
+        )
+
+    if st.session_state.last_ttft_ms is not None:
+        st.metric("Last Time to First Token", f"{st.session_state.last_ttft_ms:.0f} ms")
+
+    st.markdown(
+        "---\n\n"
+        "This analytics page currently shows **session-level** statistics. "
+        "You can extend it later to log data to a database (e.g., Supabase, Postgres) "
+        "for long-term tracking."
+    )
+
+
+# Sidebar label -> page function; the order is the order in the tool picker.
+MODES = {
+    "General Chat": render_chat_page,
+    "Resume & Cover Letter": render_resume_page,
+    "Blog / Social Post Writer": render_blog_page,
+    "Email Writer": render_email_page,
+    "Code Helper": render_code_page,
+    "Usage Analytics": render_analytics_page,
+}
+
+
+# -------------------------
+# Sidebar (theme + modes + premium)
+# -------------------------
+st.sidebar.title(APP_NAME)
+
+theme_choice = st.sidebar.selectbox("Theme", ["Light", "Dark"], index=0, key="theme")
+
+# All styles go out as a single prebuilt style-only element per rerun. They can't be
+# skipped when the theme is unchanged: Streamlit drops any element a rerun doesn't
+# re-emit.
+st.html(style_tag(*THEME_STYLESHEETS[theme_choice]))
+
+mode = st.sidebar.selectbox("Choose AI Tool", list(MODES))
+
+# Tools whose output can wait: in economy mode they go through the Batch API.
+ECONOMY_MODES = ("Resume & Cover Letter", "Blog / Social Post Writer", "Email Writer")
+economy_mode = mode in ECONOMY_MODES and st.sidebar.toggle(
+    "💸 Economy mode",
+    key="economy_mode",
+    help="Processed by OpenAI's Batch API at half the price. Results appear in the "
+    "Batch inbox, usually within minutes (at most 24 hours).",
+)
+
+@st.fragment
+def render_account_panel() -> None:
+    """Usage counter, premium unlock and upgrade links. Runs as a fragment, so typing
+    a code or pressing these buttons doesn't rerun the page; a full rerun happens
+    only when the result shows elsewhere (premium unlocked, popup opened)."""
+    st.subheader("Usage")
+    if st.session_state.is_premium:
+        st.write("Requests remaining: **Unlimited**")
+    elif FREE_DAILY_LIMIT <= 0:
+        # No free tier on this server: nothing to meter, only the upgrade path below.
+        st.write("Free requests aren't available here. Unlock **Premium** to use SuperBrain.")
+    else:
+        remaining = requests_remaining()
+        st.write(f"Requests remaining: **{remaining}** of {FREE_DAILY_LIMIT}")
+        st.progress(
+            min((FREE_DAILY_LIMIT - remaining) / FREE_DAILY_LIMIT, 1.0)
+        )
+        st.caption(
+            f"Free requests refill gradually: one every "
+            f"{format_wait(24 * 3600 / FREE_DAILY_LIMIT)}."
+        )
+
+    st.markdown("---")
+
+    # Premium unlock by code
+    st.subheader("🔑 Have a Premium Code?")
+    code_input = st.text_input("Enter access code", type="password")
+    if st.button("Unlock Premium"):
+        # Constant-time compare of fixed-size digests, so neither the code nor its
+        # length can be recovered from response timing.
+        if PREMIUM_CODE_DIGEST is not None and hmac.compare_digest(
+            _code_digest(code_input), PREMIUM_CODE_DIGEST
+        ):
+            st.session_state.is_premium = True
+            st.session_state.request_count = 0
+            st.query_params["premium"] = premium_token()
+            # The badge and limits outside this panel change too; toasts survive the rerun.
+            st.toast("🎉 Premium unlocked – enjoy unlimited usage!")
+            st.rerun()
+        else:
+            st.error("❌ Invalid or missing premium code.")
+
+    # Show upgrade info only if not premium
+    if not st.session_state.is_premium:
+        st.markdown("---")
+        st.subheader("💳 Upgrade to Premium")
+        st.markdown(
+            f"[Pay ₹299 on Razorpay]({UPGRADE_URL})"
+        )
+        st.caption(
+            "After payment, your **SuperBrain AI Premium Code** will be sent to you.\n"
+            "Enter it above to unlock unlimited access."
+        )
+
+    # Button to open premium popup
+    if not st.session_state.is_premium:
+        if st.button("View Premium Benefits"):
+            st.session_state.show_premium_popup = True
+            st.rerun()
+    else:
+        st.success("You are a Premium user. 🚀")
+
+
+with st.sidebar:
+    render_account_panel()
+
+# -------------------------
+# Top: Logo + Title + Badge
+# -------------------------
+@st.cache_resource(show_spinner=False)
+def logo_image() -> bytes | None:
+    """Logo file contents, resolved and read once per process (None if missing)."""
+    for path in ("superbrain_logo.png", "SuperBrain.png"):
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                return f.read()
+    return None
+
+
+# Each markdown call is its own element, so an opening "<div>" in one call and the
+# closing tag in another doesn't wrap what's in between. The logo is centred by a
+# keyed container instead and the badge is a single markdown element.
+logo = logo_image()
+if logo:
+    with st.container(key="logo-container"):
+        st.image(logo, width=150)
+
+# Badge (no "Free" watermark for premium)
+PLAN_BADGES = {
+    True: '<div class="badge-row"><span class="premium-badge premium-badge-pro">'
+    "✨ Premium User — Unlimited Access</span></div>",
+    False: '<div class="badge-row"><span class="premium-badge premium-badge-free">'
+    "⚡ Free User — Limited Access</span></div>",
+}
+st.markdown(PLAN_BADGES[st.session_state.is_premium], unsafe_allow_html=True)
+
+st.title(APP_NAME)
+st.caption("Your multi-skill AI assistant powered by OpenAI + Streamlit.")
+
+# -------------------------
+# Premium Popup (simple modal-like card)
+# -------------------------
+if st.session_state.show_premium_popup and not st.session_state.is_premium:
+    # The card's styles are only sent while it is open.
+    st.html(style_tag("premium-popup.css"))
+    with st.container(key="premium-popup"):
+        cols = st.columns([3, 1])
+        with cols[0]:
+            st.subheader("🚀 SuperBrain AI Premium")
+            st.write(
+                "- Unlimited AI requests per session\n"
+                "- Faster responses for heavy prompts\n"
+                "- Priority for new tools & features\n"
+                "- No free-tier usage limits or banners"
+            )
+            st.write("After you pay on Razorpay, you'll receive a **Premium Access Code** by email.")
+        with cols[1]:
+            st.markdown("**Price**")
+            st.markdown("### ₹299 / month")
+            st.markdown(
+                f"[Upgrade via Razorpay]({UPGRADE_URL})",
+                unsafe_allow_html=True,
+            )
+        # A callback, so the rerun it triggers already renders without the card.
+        st.button(
+            "Close Premium Details",
+            on_click=lambda: st.session_state.update(show_premium_popup=False),
+        )
+
+st.write("---")
+
+# -------------------------
+# MAIN MODES
+# -------------------------
+# Only the selected tool's page function runs on a rerun.
+MODES[mode]()
+
+# -------------------------
+# Batch inbox (background Batch API jobs of this session)
+# -------------------------
+@st.fragment(run_every=30)
+def render_batch_inbox() -> None:
+    """Status and results of queued batch jobs; refreshes itself every 30 seconds."""
+    jobs = st.session_state.batch_jobs
+    done = 0
+    entries = []
+    for entry in jobs:
+        job = get_batch_jobs().get(entry["id"]) or {"status": "unknown", "results": None, "error": None}
+        done += job["results"] is not None or job["error"] is not None
+        entries.append((entry, job))
+
+    with st.expander(f"📥 Batch inbox ({done}/{len(jobs)} ready)", expanded=done > 0):
+        for entry, job in reversed(entries):
+            st.markdown(f"**{entry['title']}** · queued {entry['submitted_at']} · `{job['status']}`")
+            if job["error"]:
+                st.error(job["error"])
+            elif job["results"] is not None:
+                for i, label in enumerate(entry["labels"]):
+                    outputs = job["results"].get(f"request-{i}", ["❌ Missing from batch output."])
+                    for k, output in enumerate(outputs, start=1):
+                        st.markdown(f"#### {label}" + (f" (variant {k})" if len(outputs) > 1 else ""))
+                        if entry.get("sections"):
+                            write_sections(output, entry["sections"])
+                        else:
+                            st.write(output)
+            st.write("---")
+
+
+if st.session_state.batch_jobs:
+    render_batch_inbox()